@@ -1 +1 @@
-__all__ = ['mpw', 'cmd', 'algorithm']
+__all__ = ['mpw', 'cmd', 'algorithm', 'cache', 'batch', 'stdio', 'policy', 'records', 'normalize']
@@ -17,6 +17,8 @@
 #
 # =============================================================================
 
+import warnings
+
 from Crypto.Hash import HMAC, SHA256
 import scrypt
 
@@ -42,20 +44,67 @@ def Algorithm(version):
     else:
         raise ValueError('invalid version')
 
+def identicon(master_password, name):
+    '''
+    Generate the identicon for a set of login details.
+
+    The identicon is cheap to compute (it does not require the master key), so
+    it can be shown straight after the master password is entered to help
+    catch typos before the expensive key derivation is run.
+
+    Args:
+        master_password: The master password.
+        name: The user's full name.
+
+    Returns:
+        A tuple of the identicon string and its color name.
+    '''
+
+    seed = HMAC.new(utf8(master_password), utf8(name), SHA256).digest()
+
+    icon = IDENTICON_LEFT_ARMS[seed[0] % len(IDENTICON_LEFT_ARMS)] + \
+           IDENTICON_BODIES[seed[1] % len(IDENTICON_BODIES)] + \
+           IDENTICON_RIGHT_ARMS[seed[2] % len(IDENTICON_RIGHT_ARMS)] + \
+           IDENTICON_ACCESSORIES[seed[3] % len(IDENTICON_ACCESSORIES)]
+    color = IDENTICON_COLORS[seed[4] % len(IDENTICON_COLORS)]
+
+    return icon, color
+
 class AlgorithmBase:
-    def generate_key(self, master_password, salt_string):
+    VERSION = None
+
+    def generate_key(self, master_password, salt_string, cache=None):
         '''
         Generate the master key.
 
         Args:
             master_password: A secret string used to derive the key.
             salt_string: A string used to improve the key's security.
+            cache: An optional key cache to reuse previously generated keys.
 
         Returns:
             The master key.
         '''
 
-        return self._master_key(master_password, salt_string)
+        # the cache is only an optimization, so if it fails the key is
+        # generated (or just not stored) as if it wasn't there
+        if cache is not None:
+            try:
+                key = cache.get(self.VERSION, salt_string, master_password)
+            except OSError as e:
+                warnings.warn('could not read from the key cache: {}'.format(e))
+            else:
+                if key is not None:
+                    return key
+
+        key = self._master_key(master_password, salt_string)
+        if cache is not None:
+            try:
+                cache.put(self.VERSION, salt_string, master_password, key)
+            except OSError as e:
+                warnings.warn('could not write to the key cache: {}'.format(e))
+
+        return key
 
     def generate_password(self, key, site, counter, template_type):
         '''
@@ -74,6 +123,55 @@ class AlgorithmBase:
         seed = self._site_seed(key, site, counter)
         return self._site_password(seed, template_type)
 
+    def generate_passwords(self, key, site, counter, template_types=None):
+        '''
+        Generate a site password for several templates at once.
+
+        The site seed is only computed once and shared between all of the
+        templates.
+
+        Args:
+            key: The master key.
+            site: The site's name.
+            counter: The password version to generate.
+            template_types: The types of password to generate (defaults to
+                all of them).
+
+        Returns:
+            A dictionary mapping each template type to its site password.
+        '''
+
+        if template_types is None:
+            template_types = TEMPLATE_TYPES
+
+        seed = self._site_seed(key, site, counter)
+        return {template_type: self._site_password(seed, template_type)
+                for template_type in template_types}
+
+    def iter_passwords(self, key, site, counter, template_type):
+        '''
+        Generate site passwords for successive counters.
+
+        The HMAC state keyed with the master key is only set up once, and
+        reused for every counter.
+
+        Args:
+            key: The master key.
+            site: The site's name.
+            counter: The first password version to generate.
+            template_type: The type of password to generate.
+
+        Yields:
+            Tuples of the counter and the generated site password.
+        '''
+
+        keyed = HMAC.new(key, digestmod=SHA256)
+        while counter <= MAX_COUNTER:
+            mac = keyed.copy()
+            mac.update(self._site_message(site, counter))
+            yield counter, self._site_password(mac.digest(), template_type)
+            counter += 1
+
     # protected methods for subclasses to override
     def _master_key(self, master_password, salt_string):
         pass
@@ -81,10 +179,15 @@ class AlgorithmBase:
     def _site_seed(self, key, site, counter):
         pass
 
+    def _site_message(self, site, counter):
+        pass
+
     def _site_password(self, seed, template_type):
         pass
 
 class AlgorithmV0(AlgorithmBase):
+    VERSION = 0
+
     def _master_key(self, master_password, salt_string):
         salt = utf8(PACKAGE_NAME) + \
                uint_32(len(salt_string)) + \
@@ -93,12 +196,15 @@ class AlgorithmV0(AlgorithmBase):
         return key
 
     def _site_seed(self, key, site, counter):
+        seed = HMAC.new(key, self._site_message(site, counter), SHA256).digest()
+        return seed
+
+    def _site_message(self, site, counter):
         msg = utf8(PACKAGE_NAME) + \
               uint_32(len(site)) + \
               utf8(site) + \
               uint_32(counter)
-        seed = HMAC.new(key, msg, SHA256).digest()
-        return seed
+        return msg
 
     def _site_password(self, seed, template_type):
         seed = list(seed)
@@ -122,6 +228,8 @@ class AlgorithmV0(AlgorithmBase):
         return ''.join(password)
 
 class AlgorithmV1(AlgorithmV0):
+    VERSION = 1
+
     def _site_password(self, seed, template_type):
         templates = TEMPLATE_TYPES[template_type]
         template = templates[seed[0] % len(templates)]
@@ -138,15 +246,18 @@ class AlgorithmV1(AlgorithmV0):
         return ''.join(password)
 
 class AlgorithmV2(AlgorithmV1):
-    def _site_seed(self, key, site, counter):
+    VERSION = 2
+
+    def _site_message(self, site, counter):
         msg = utf8(PACKAGE_NAME) + \
               uint_32(len(utf8(site))) + \
               utf8(site) + \
               uint_32(counter)
-        seed = HMAC.new(key, msg, SHA256).digest()
-        return seed
+        return msg
 
 class AlgorithmV3(AlgorithmV2):
+    VERSION = 3
+
     def _master_key(self, master_password, salt_string):
         salt = utf8(PACKAGE_NAME) + \
                uint_32(len(utf8(salt_string))) + \
@@ -157,6 +268,7 @@ class AlgorithmV3(AlgorithmV2):
 # the following constants are taken directly from
 # https://github.com/Lyndir/MasterPassword/blob/master/core/c/mpw-types.c
 PACKAGE_NAME = 'com.lyndir.masterpassword'
+MAX_COUNTER = 2 ** 32 - 1
 TEMPLATE_TYPES = {
     'maximum': [
         'anoxxxxxxxxxxxxxxxxx', 'axxxxxxxxxxxxxxxxxno'
@@ -200,6 +312,19 @@ CHARACTER_GROUPS = {
     'x': "AEIOUaeiouBCDFGHJKLMNPQRSTVWXYZbcdfghjklmnpqrstvwxyz0123456789!@#$%^&*()"
 }
 
+# identicon parts, from
+# https://github.com/Lyndir/MasterPassword/blob/master/core/c/mpw-algorithm.c
+IDENTICON_LEFT_ARMS = ['╔', '╚', '╰', '═']
+IDENTICON_RIGHT_ARMS = ['╗', '╝', '╯', '═']
+IDENTICON_BODIES = ['█', '░', '▒', '▓', '☺', '☻']
+IDENTICON_ACCESSORIES = [
+    '◈', '◎', '◐', '◑', '◒', '◓', '☀', '☁', '☂', '☃', '☄', '★', '☆', '☎', '☏',
+    '⎈', '⌂', '☘', '☢', '☣', '☕', '⌚', '⌛', '⏰', '⚡', '⛄', '⛅', '☔', '♔',
+    '♕', '♖', '♗', '♘', '♙', '♚', '♛', '♜', '♝', '♞', '♟', '♨', '♩', '♪', '♫',
+    '⚐', '⚑', '⚔', '⚖', '⚙', '⚠', '⌘', '⏎', '✄', '✆', '✈', '✉', '✌'
+]
+IDENTICON_COLORS = ['red', 'green', 'yellow', 'blue', 'magenta', 'cyan', 'white']
+
 def uint_32(i):
     return i.to_bytes(4, 'big')
 
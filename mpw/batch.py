@@ -0,0 +1,362 @@
+# =============================================================================
+#
+#  Copyright (c) 2017, Justin Chadwell.
+#
+#  This program is free software: you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation, either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You can find a copy of the GNU General Public License in the LICENSE file.
+#  Alternatively, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+import os
+import csv
+import json
+import heapq
+
+from Crypto.Hash import HMAC, SHA256
+
+from .algorithm import TEMPLATE_TYPES
+from .normalize import Memo, normalize_site, has_length_quirk
+
+def run(generator, key, input_path, output_path, counter=1, template='long',
+        shard=(0, 1), checkpoint_path=None, checkpoint_every=1000,
+        normalize=(), memo_size=10000, on_quirk=None, name=None):
+    '''
+    Generate site passwords for every site listed in an input file.
+
+    The input is a CSV file with one site per row, optionally followed by the
+    counter and the template to use for it. Each output row contains the
+    input row's index, the site (as given in the input), the normalized site
+    (which the password is generated for), the counter, the template and the
+    password.
+
+    Args:
+        generator: The algorithm object to generate passwords with.
+        key: The master key.
+        input_path: The input CSV file.
+        output_path: The output CSV file.
+        counter: The default password counter.
+        template: The default password template, or 'all'.
+        shard: A tuple of the shard to generate and the total number of
+            shards, only input rows in this shard are generated.
+        checkpoint_path: A file to periodically save progress to, if it
+            already exists then the job is resumed from it.
+        checkpoint_every: The number of input rows between checkpoints.
+        normalize: The normalization rules to apply to site names.
+        memo_size: The number of recent results to memoize, so duplicate
+            rows are only generated once.
+        on_quirk: A function called with the row index and site of every
+            row whose seed differs between versions 0/1 and 2/3.
+        name: The user's full name, stored in checkpoints.
+
+    Returns:
+        The number of passwords generated.
+    '''
+
+    index, shards = shard
+    if not 0 <= index < shards:
+        raise ValueError('invalid shard')
+
+    job = describe_job(input_path, counter, template, shard, normalize,
+            generator.VERSION, name)
+    job['key'] = key_fingerprint(key)
+
+    checkpoint = None
+    if checkpoint_path is not None:
+        checkpoint = resume(checkpoint_path, output_path, job)
+    if checkpoint is not None:
+        start = checkpoint['input_offset']
+
+        # discard any rows written after the checkpoint
+        with open(output_path, 'r+b') as f:
+            f.truncate(checkpoint['output_size'])
+        mode = 'a'
+    else:
+        start = 0
+        mode = 'w'
+
+    memo = Memo(memo_size)
+    count = 0
+    offset = start
+    with open(input_path, newline='', encoding='utf-8') as fin, \
+         open_private(output_path, mode) as fout:
+        writer = csv.writer(fout)
+
+        rows = read_rows(fin, counter, template)
+        for i, site, site_counter, site_template in rows:
+            if i < start: continue
+
+            if i % shards == index:
+                try:
+                    normalized = normalize_site(site, normalize)
+                except ValueError as e:
+                    raise ValueError('{} on row {}'.format(e, i + 1))
+                if on_quirk is not None and has_length_quirk(normalized):
+                    on_quirk(i, normalized)
+
+                memo_key = (normalized, site_counter, site_template, generator.VERSION)
+                passwords = memo.get(memo_key, lambda: generate(generator, key,
+                        normalized, site_counter, site_template))
+
+                for site_template, password in passwords.items():
+                    writer.writerow([i, site, normalized, site_counter,
+                            site_template, password])
+                    count += 1
+
+            offset = i + 1
+            if checkpoint_path is not None and offset % checkpoint_every == 0:
+                save_checkpoint(checkpoint_path, fout, offset, job)
+
+        if checkpoint_path is not None:
+            save_checkpoint(checkpoint_path, fout, offset, job, complete=True)
+
+    return count
+
+def generate(generator, key, site, counter, template):
+    '''
+    Generate the site passwords for a single row.
+
+    Args:
+        generator: The algorithm object.
+        key: The master key.
+        site: The site's name.
+        counter: The password counter.
+        template: The password template, or 'all'.
+
+    Returns:
+        A dictionary mapping each template to its site password.
+    '''
+
+    if template == 'all':
+        return generator.generate_passwords(key, site, counter)
+    else:
+        return {template: generator.generate_password(key, site, counter, template)}
+
+def merge(input_paths, output_path):
+    '''
+    Merge the outputs of several shards back into the original input order.
+
+    Args:
+        input_paths: The output CSV files of each shard.
+        output_path: The merged output CSV file.
+    '''
+
+    files = [open(path, newline='', encoding='utf-8') for path in input_paths]
+    try:
+        readers = [csv.reader(f) for f in files]
+        with open_private(output_path, 'w') as fout:
+            writer = csv.writer(fout)
+            writer.writerows(heapq.merge(*readers, key=lambda row: int(row[0])))
+    finally:
+        for f in files:
+            f.close()
+
+def read_rows(f, counter=1, template='long'):
+    '''
+    Read the site details from an input CSV file.
+
+    Blank rows are skipped (but still counted towards the row index).
+
+    Args:
+        f: The file to read from.
+        counter: The default password counter.
+        template: The default password template.
+
+    Yields:
+        Tuples of the row index, site, counter and template.
+    '''
+
+    for i, row in enumerate(csv.reader(f)):
+        if not row or not row[0]: continue
+
+        site = row[0]
+        try:
+            site_counter = int(row[1]) if len(row) > 1 and row[1] else counter
+        except ValueError:
+            raise ValueError('invalid counter on row {}'.format(i + 1))
+        site_template = row[2] if len(row) > 2 and row[2] else template
+        if site_template != 'all' and site_template not in TEMPLATE_TYPES:
+            raise ValueError('invalid template on row {}'.format(i + 1))
+
+        yield i, site, site_counter, site_template
+
+def validate(input_path, counter=1, template='long', normalize=()):
+    '''
+    Check that every row of an input CSV file can be read and normalized,
+    without generating anything.
+
+    Args:
+        input_path: The input CSV file.
+        counter: The default password counter.
+        template: The default password template.
+        normalize: The normalization rules to apply to site names.
+    '''
+
+    with open(input_path, newline='', encoding='utf-8') as f:
+        for i, site, _, _ in read_rows(f, counter, template):
+            try:
+                normalize_site(site, normalize)
+            except ValueError as e:
+                raise ValueError('{} on row {}'.format(e, i + 1))
+
+def describe_job(input_path, counter=1, template='long', shard=(0, 1),
+        normalize=(), version=None, name=None):
+    '''
+    Describe a job's input and options, for storing in its checkpoints.
+
+    Args:
+        input_path: The input CSV file.
+        counter: The default password counter.
+        template: The default password template.
+        shard: The shard being generated.
+        normalize: The normalization rules applied to site names.
+        version: The algorithm version.
+        name: The user's full name.
+
+    Returns:
+        The job description.
+    '''
+
+    return {
+        'version': version,
+        'name': name,
+        'input': os.path.abspath(input_path),
+        'input_size': os.path.getsize(input_path),
+        'counter': counter,
+        'template': template,
+        'shard': list(shard),
+        'normalize': list(normalize)
+    }
+
+def resume(checkpoint_path, output_path, job):
+    '''
+    Load the checkpoint to resume a job from, checking that it belongs to the
+    same job. Only the fields present in the job description are checked.
+
+    Args:
+        checkpoint_path: The checkpoint file.
+        output_path: The output CSV file.
+        job: The job description, from describe_job.
+
+    Returns:
+        The checkpoint, or None if the job has not been started.
+    '''
+
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint is None: return None
+
+    for field, value in job.items():
+        if checkpoint.get(field) != value:
+            raise ValueError('checkpoint does not match the job ({} differs)'
+                    .format(field))
+    if checkpoint.get('complete'):
+        raise ValueError('checkpoint is for a job that has already finished')
+    if not os.path.isfile(output_path):
+        raise ValueError('checkpoint output file {} is missing'.format(output_path))
+
+    return checkpoint
+
+def key_fingerprint(key):
+    '''
+    Fingerprint a master key, so that checkpoints can tell whether a job is
+    resumed with the same key without storing anything secret.
+
+    Args:
+        key: The master key.
+
+    Returns:
+        The key fingerprint.
+    '''
+
+    return HMAC.new(key, b'mpw-batch-checkpoint', SHA256).hexdigest()[:16]
+
+def load_checkpoint(path):
+    '''
+    Load a saved checkpoint.
+
+    Args:
+        path: The checkpoint file.
+
+    Returns:
+        The checkpoint, or None if it does not exist.
+    '''
+
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_checkpoint(path, output, input_offset, job, complete=False):
+    '''
+    Save the progress of a job, so that it can be resumed later.
+
+    Args:
+        path: The checkpoint file.
+        output: The output file being written to.
+        input_offset: The number of input rows that have been processed.
+        job: The job description, from describe_job.
+        complete: Whether the job has finished.
+    '''
+
+    output.flush()
+    os.fsync(output.fileno())
+
+    checkpoint = dict(job,
+        input_offset=input_offset,
+        output_size=os.fstat(output.fileno()).st_size,
+        complete=complete
+    )
+
+    # write atomically, so a crash never leaves a half written checkpoint
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def open_private(path, mode):
+    '''
+    Open a text file for writing that only the current user can read, since
+    it contains site passwords.
+
+    Args:
+        path: The file to open.
+        mode: Either 'w' to truncate the file, or 'a' to append to it.
+
+    Returns:
+        The opened file.
+    '''
+
+    flags = os.O_WRONLY | os.O_CREAT
+    flags |= os.O_APPEND if mode == 'a' else os.O_TRUNC
+
+    fd = os.open(path, flags, 0o600)
+    os.fchmod(fd, 0o600)
+    return open(fd, mode, newline='', encoding='utf-8')
+
+def parse_shard(value):
+    '''
+    Parse a shard specifier of the form 'i/n'.
+
+    Args:
+        value: The shard specifier.
+
+    Returns:
+        A tuple of the shard index and the total number of shards.
+    '''
+
+    index, shards = value.split('/')
+    index, shards = int(index), int(shards)
+    if not 0 <= index < shards:
+        raise ValueError('invalid shard')
+
+    return index, shards
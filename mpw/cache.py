@@ -0,0 +1,295 @@
+# =============================================================================
+#
+#  Copyright (c) 2017, Justin Chadwell.
+#
+#  This program is free software: you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation, either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You can find a copy of the GNU General Public License in the LICENSE file.
+#  Alternatively, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+import os
+import hmac
+import time
+import shutil
+import subprocess
+
+from Crypto.Hash import HMAC, SHA256
+
+from .algorithm import uint_32, utf8
+
+def Cache(backend, timeout=900, **kwargs):
+    '''
+    Create a cache object to store master keys between mpw invocations.
+
+    Args:
+        backend: The cache backend to create ('session', 'user' or 'file').
+        timeout: The number of seconds a master key is kept for.
+        **kwargs: Any extra backend specific arguments.
+
+    Returns:
+        A cache object.
+    '''
+
+    if backend == 'session':
+        return KeyringCache('@s', timeout, **kwargs)
+    elif backend == 'user':
+        return KeyringCache('@u', timeout, **kwargs)
+    elif backend == 'file':
+        return FileCache(timeout=timeout, **kwargs)
+    else:
+        raise ValueError('invalid cache backend')
+
+class CacheError(OSError):
+    '''
+    Raised when a cache backend cannot be used.
+    '''
+
+class CacheBase:
+    def __init__(self, timeout):
+        # a timeout of 0 would make keyctl keep the key forever
+        if timeout <= 0:
+            raise ValueError('cache timeout must be positive')
+        self.timeout = timeout
+
+    def get(self, version, name, master_password):
+        '''
+        Get a cached master key.
+
+        Args:
+            version: The algorithm version used to generate the key.
+            name: The user's full name.
+            master_password: The master password.
+
+        Returns:
+            The master key, or None if it is not cached.
+        '''
+
+        payload = self._get(self._ident(version, name))
+        if payload is None or len(payload) <= TAG_SIZE: return None
+
+        key, tag = payload[:-TAG_SIZE], payload[-TAG_SIZE:]
+        if not hmac.compare_digest(tag, self._tag(key, master_password)):
+            return None
+
+        return key
+
+    def put(self, version, name, master_password, key):
+        '''
+        Store a master key in the cache.
+
+        Args:
+            version: The algorithm version used to generate the key.
+            name: The user's full name.
+            master_password: The master password.
+            key: The master key.
+        '''
+
+        self._put(self._ident(version, name), key + self._tag(key, master_password))
+
+    def forget(self, version, name):
+        '''
+        Remove a single master key from the cache.
+
+        Args:
+            version: The algorithm version used to generate the key.
+            name: The user's full name.
+        '''
+
+        self._remove(self._ident(version, name))
+
+    def clear(self):
+        '''
+        Remove all master keys from the cache.
+        '''
+
+        pass
+
+    def _ident(self, version, name):
+        # entries are only named by the version and name, the names can be
+        # read without the key so they must not reveal anything about the
+        # master password
+        msg = uint_32(version) + utf8(name)
+        return SHA256.new(msg).hexdigest()
+
+    def _tag(self, key, master_password):
+        # stored alongside the key to check the master password, this can
+        # only be brute-forced by someone who already has the key
+        return HMAC.new(key, utf8(master_password), SHA256).digest()
+
+    # protected methods for subclasses to override
+    def _get(self, ident):
+        pass
+
+    def _put(self, ident, payload):
+        pass
+
+    def _remove(self, ident):
+        pass
+
+class KeyringCache(CacheBase):
+    '''
+    Cache master keys in the Linux kernel keyring, using keyctl(1).
+
+    The kernel takes care of discarding the keys once they time out, or when
+    the keyring itself goes away (e.g. at the end of the login session).
+    '''
+
+    def __init__(self, keyring='@s', timeout=900, keyctl='keyctl'):
+        super().__init__(timeout)
+        if shutil.which(keyctl) is None:
+            raise CacheError('could not find keyctl (is keyutils installed?)')
+        self.keyring = keyring
+        self.keyctl = keyctl
+
+    def clear(self):
+        ids = self._keyctl('rlist', self.keyring).split()
+        for kid in ids:
+            try:
+                description = self._keyctl('rdescribe', kid)
+            except CacheError:
+                continue  # key has expired in the meantime
+
+            kind, *_, name = description.strip().split(';')
+            if kind == 'user' and name.startswith(KEY_PREFIX):
+                self._keyctl('unlink', kid, self.keyring)
+
+    def _get(self, ident):
+        kid = self._search(ident)
+        if kid is None: return None
+
+        try:
+            return self._keyctl('pipe', kid, text=False)
+        except CacheError:
+            return None
+
+    def _put(self, ident, payload):
+        kid = self._keyctl('padd', 'user', KEY_PREFIX + ident, self.keyring,
+                data=payload).strip()
+        try:
+            self._keyctl('timeout', kid, str(self.timeout))
+        except CacheError:
+            # never leave a key behind that will not expire
+            self._keyctl('unlink', kid, self.keyring)
+            raise
+
+    def _remove(self, ident):
+        kid = self._search(ident)
+        if kid is not None:
+            self._keyctl('unlink', kid, self.keyring)
+
+    def _search(self, ident):
+        try:
+            kid = self._keyctl('search', self.keyring, 'user', KEY_PREFIX + ident)
+            return kid.strip()
+        except CacheError:
+            return None
+
+    def _keyctl(self, *args, data=None, text=True):
+        try:
+            result = subprocess.run([self.keyctl] + list(args), input=data,
+                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+        except FileNotFoundError:
+            raise CacheError('could not find keyctl (is keyutils installed?)')
+        except subprocess.CalledProcessError:
+            raise CacheError('keyctl {} failed'.format(args[0]))
+        return result.stdout.decode() if text else result.stdout
+
+class FileCache(CacheBase):
+    '''
+    Cache master keys as files in a directory.
+
+    This is a stand-in for KeyringCache on systems without a kernel keyring
+    (and for testing), each key is stored in a file only readable by the
+    current user, along with its expiry time.
+    '''
+
+    def __init__(self, path=None, timeout=900):
+        super().__init__(timeout)
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.cache', 'mpw')
+        self.path = path
+
+    def clear(self):
+        for ident in self._idents():
+            self._remove(ident)
+
+    def sweep(self):
+        '''
+        Remove all expired master keys from the cache.
+        '''
+
+        for ident in self._idents():
+            self._read(ident)
+
+    def _get(self, ident):
+        return self._read(ident)
+
+    def _put(self, ident, payload):
+        self.sweep()
+        os.makedirs(self.path, mode=0o700, exist_ok=True)
+
+        expiry = int(time.time() + self.timeout)
+        fd = os.open(self._filename(ident),
+                os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(expiry.to_bytes(8, 'big') + payload)
+
+    def _remove(self, ident):
+        try:
+            os.remove(self._filename(ident))
+        except FileNotFoundError:
+            pass
+
+    def _read(self, ident):
+        # read an entry, removing it if it has expired
+        try:
+            with open(self._filename(ident), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        expiry = int.from_bytes(data[:8], 'big')
+        if expiry <= time.time():
+            self._remove(ident)
+            return None
+
+        return data[8:]
+
+    def _idents(self):
+        if not os.path.isdir(self.path): return []
+
+        return [filename[len(KEY_PREFIX):] for filename in os.listdir(self.path)
+                if filename.startswith(KEY_PREFIX)]
+
+    def _filename(self, ident):
+        return os.path.join(self.path, KEY_PREFIX + ident)
+
+def parse_timeout(value):
+    '''
+    Parse a cache timeout.
+
+    Args:
+        value: The number of seconds a master key is kept for.
+
+    Returns:
+        The timeout.
+    '''
+
+    timeout = int(value)
+    if timeout <= 0:
+        raise ValueError('cache timeout must be positive')
+
+    return timeout
+
+KEY_PREFIX = 'mpw-'
+TAG_SIZE = SHA256.digest_size
@@ -17,17 +17,67 @@
 #
 # =============================================================================
 
+import sys
 from getpass import getpass
 from shutil import get_terminal_size
 
 from . import algorithm
 
-def generate(name, version, site, template, counter, stdout, clipboard):
-    password = getpass('Master Password: ')
+def generate(name, version, site, template, counter, stdout, clipboard,
+        cache=None, cache_timeout=900, policy=None):
+    site_policy = None
+    if policy is not None:
+        from . import policy as policy_
+
+        try:
+            site_policy = policy_.load_policies(policy).get(site)
+        except (OSError, ValueError, TypeError) as e:
+            print('Could not load policies: {}'.format(e), file=sys.stderr)
+            return None
+
+        # check the policy before the (slow) key generation
+        if site_policy is None:
+            print('No policy found for "{}".'.format(site), file=sys.stderr)
+        elif template == 'all':
+            print('Cannot apply a policy to all templates.', file=sys.stderr)
+            return None
+        elif not site_policy.feasible(template):
+            print('The policy can never be satisfied by the "{}" template.'
+                    .format(template), file=sys.stderr)
+            return None
+
+    try:
+        key_cache = make_cache(cache, cache_timeout)
+    except (OSError, ValueError) as e:
+        print('Error: {}'.format(e), file=sys.stderr)
+        return None
+
+    password = read_master_password(name)
 
     gen = algorithm.Algorithm(version)
-    key = gen.generate_key(password, name)
-    site_password = gen.generate_password(key, site, counter, template)
+    key = gen.generate_key(password, name, key_cache)
+
+    if template == 'all':
+        site_passwords = gen.generate_passwords(key, site, counter)
+        if stdout:
+            for template, site_password in site_passwords.items():
+                print('{}: "{}"'.format(template, site_password))
+        if clipboard:
+            print('Cannot copy multiple passwords to clipboard.', file=sys.stderr)
+
+        return site_passwords
+
+    if site_policy is not None:
+        result = policy_.search(gen, key, site, template, site_policy, counter)
+        if result is None:
+            print('Could not find a password matching the policy.', file=sys.stderr)
+            return None
+
+        site_password, site_counter = result
+        if site_counter != counter:
+            print('Site Counter: {}'.format(site_counter), file=sys.stderr)
+    else:
+        site_password = gen.generate_password(key, site, counter, template)
 
     if stdout:
         print('Site Password: "{}"'.format(site_password))
@@ -37,12 +87,138 @@ def generate(name, version, site, template, counter, stdout, clipboard):
 
     return site_password
 
+def batch(name, version, input, output, template, counter, shard,
+        checkpoint, checkpoint_every, normalize=(), memo_size=10000,
+        report_quirks=False, cache=None, cache_timeout=900):
+    from . import batch
+
+    # check the input and checkpoint before the (slow) key generation
+    try:
+        batch.validate(input, counter, template, normalize)
+        if checkpoint is not None:
+            job = batch.describe_job(input, counter, template, shard, normalize,
+                    version, name)
+            batch.resume(checkpoint, output, job)
+        key_cache = make_cache(cache, cache_timeout)
+    except (OSError, ValueError) as e:
+        print('Error: {}'.format(e), file=sys.stderr)
+        return None
+
+    password = read_master_password(name)
+
+    gen = algorithm.Algorithm(version)
+    key = gen.generate_key(password, name, key_cache)
+
+    def on_quirk(index, site):
+        print('Row {}: the password for "{}" differs between versions 0/1 and 2/3.'
+                .format(index + 1, site), file=sys.stderr)
+
+    try:
+        count = batch.run(gen, key, input, output, counter, template, shard,
+                checkpoint, checkpoint_every, normalize, memo_size,
+                on_quirk if report_quirks else None, name)
+    except (OSError, ValueError) as e:
+        print('Error: {}'.format(e), file=sys.stderr)
+        return None
+
+    print('Generated {} passwords.'.format(count), file=sys.stderr)
+    return count
+
+def merge(inputs, output):
+    from . import batch
+
+    batch.merge(inputs, output)
+
+def stdio(workers, cache=None, cache_timeout=900):
+    from . import stdio
+
+    try:
+        key_cache = make_cache(cache, cache_timeout)
+    except (OSError, ValueError) as e:
+        print('Error: {}'.format(e), file=sys.stderr)
+        return None
+
+    server = stdio.StdioServer(sys.stdin, sys.stdout, workers, key_cache)
+    server.run()
+
+def pack(inputs, output):
+    import csv
+    from . import records
+
+    def entries():
+        for path in inputs:
+            with open(path, newline='', encoding='utf-8') as f:
+                for i, row in enumerate(csv.reader(f)):
+                    try:
+                        if len(row) != 6:
+                            raise ValueError('expected 6 columns')
+                        _, _, site, counter, template, password = row
+                        try:
+                            counter = int(counter)
+                        except ValueError:
+                            raise ValueError('invalid counter')
+                        records.check_entry(site, counter, template, password)
+                    except ValueError as e:
+                        raise ValueError('{} (row {} of {})'.format(e, i + 1, path))
+
+                    yield site, counter, template, password
+
+    try:
+        count = records.write(output, entries())
+    except (OSError, ValueError) as e:
+        print('Error: {}'.format(e), file=sys.stderr)
+        return None
+
+    print('Packed {} passwords.'.format(count), file=sys.stderr)
+    return count
+
+def lookup(input, site, counter, template):
+    from . import records
+
+    try:
+        with records.RecordFile(input) as rf:
+            results = rf.lookup(site, counter, template)
+    except (OSError, ValueError) as e:
+        print('Error: {}'.format(e), file=sys.stderr)
+        return None
+
+    for site_counter, site_template, site_password in results:
+        print('{} {}: "{}"'.format(site_counter, site_template, site_password))
+
+    return results
+
+def identicon(names):
+    if not names:
+        names = (line.strip() for line in sys.stdin)
+
+    for name in names:
+        if not name: continue
+
+        password = getpass('Master Password ({}): '.format(name))
+        icon, color = algorithm.identicon(password, name)
+        print('{}: {} ({})'.format(name, icon, color))
+
+def forget(cache):
+    try:
+        make_cache(cache).clear()
+    except (OSError, ValueError) as e:
+        print('Error: {}'.format(e), file=sys.stderr)
+        return None
+
 def prompt(*args, **kwargs):
-    p = Prompt(*args, **kwargs)
+    try:
+        p = Prompt(*args, **kwargs)
+    except (OSError, ValueError) as e:
+        print('Error: {}'.format(e), file=sys.stderr)
+        return None
     p.run()
 
 def dprompt(*args, **kwargs):
-    dp = DialogPrompt(*args, **kwargs)
+    try:
+        dp = DialogPrompt(*args, **kwargs)
+    except (OSError, ValueError) as e:
+        print('Error: {}'.format(e), file=sys.stderr)
+        return None
     dp.run()
 
 class PromptInterface:
@@ -50,7 +226,8 @@ class PromptInterface:
     Base class for all Prompt-like interfaces for password generation.
     '''
 
-    def __init__(self, name, version, site, template, counter, stdout, clipboard, loop):
+    def __init__(self, name, version, site, template, counter, stdout, clipboard, loop,
+            cache=None, cache_timeout=900):
         self.name = self.default_name = name
         self.version = self.default_version = version
         self.site = self.default_site = site
@@ -60,6 +237,7 @@ class PromptInterface:
         self.stdout = stdout
         self.clipboard = clipboard
         self.loop = loop
+        self.cache = make_cache(cache, cache_timeout)
 
         self.master_password = None
         self.site_password = None
@@ -74,7 +252,7 @@ class PromptInterface:
             if not self.password(): continue
 
             generator = algorithm.Algorithm(self.version)
-            key = generator.generate_key(self.master_password, self.name)
+            key = generator.generate_key(self.master_password, self.name, self.cache)
 
             while True:
                 if not self.site_details(): break
@@ -137,10 +315,7 @@ class Prompt(PromptInterface):
         return True
 
     def password(self):
-        while True:
-            self.master_password = getpass('Master Password: ')
-            if len(self.master_password) != 0: break
-
+        self.master_password = read_master_password(self.name)
         return True
 
     def site_details(self):
@@ -232,8 +407,12 @@ class DialogPrompt(PromptInterface):
             # error message
             if len(self.master_password) == 0:
                 self.dialog.msgbox('Must input a master password.')
-            else:
-                break
+                continue
+
+            # confirm identicon before the (slow) key generation
+            msg = '{}\n\nIs this correct?'.format(
+                    identicon_message(self.master_password, self.name))
+            if self.dialog.yesno(msg) == self.dialog.OK: break
 
         return True
 
@@ -291,6 +470,65 @@ class DialogPrompt(PromptInterface):
             clipboard_copy(self.site_password)
         if messages: self.dialog.msgbox('\n'.join(messages))
 
+def read_master_password(name):
+    '''
+    Utility function to read the master password from the terminal.
+
+    The identicon is displayed (on stderr) once the master password has been
+    entered, and when running interactively, the user can confirm it or
+    re-enter the master password before the (slow) key generation starts.
+
+    Args:
+        name: The user's full name.
+
+    Returns:
+        The master password.
+    '''
+
+    while True:
+        master_password = getpass('Master Password: ')
+        if len(master_password) == 0: continue
+
+        print(identicon_message(master_password, name), file=sys.stderr)
+        if not sys.stdin.isatty(): break
+
+        print('Is this correct? (Y/n): ', end='', file=sys.stderr, flush=True)
+        if input().strip().lower() not in ('n', 'no'): break
+
+    return master_password
+
+def identicon_message(master_password, name):
+    '''
+    Utility function to describe the identicon for a set of login details.
+
+    Args:
+        master_password: The master password.
+        name: The user's full name.
+
+    Returns:
+        A message displaying the identicon.
+    '''
+
+    icon, color = algorithm.identicon(master_password, name)
+    return 'Identicon: {} ({})'.format(icon, color)
+
+def make_cache(backend, timeout=900):
+    '''
+    Utility function to create a master key cache.
+
+    Args:
+        backend: The keyring to cache keys in, or None for no cache.
+        timeout: The number of seconds a master key is kept for.
+
+    Returns:
+        The cache object, or None.
+    '''
+
+    if backend is None: return None
+
+    from . import cache
+    return cache.Cache(backend, timeout)
+
 def clipboard_copy(data):
     '''
     Utility function to copy a string to the system clipboard.
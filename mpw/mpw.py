@@ -19,9 +19,13 @@
 
 import sys
 import argparse
+import warnings
 
 from . import algorithm
+from . import batch
+from . import cache
 from . import cmd
+from . import normalize
 
 def main(*arglist):
     # mpw
@@ -37,7 +41,7 @@ def main(*arglist):
             choices=[0, 1, 2, 3], help='MasterPassword algorithm version')
     generate.add_argument('site', help='The site name')
     generate.add_argument('-t', '--template', default='long',
-            choices=algorithm.TEMPLATE_TYPES,
+            choices=list(algorithm.TEMPLATE_TYPES) + ['all'],
             help='The password type template')
     generate.add_argument('-c', '--counter', type=int, default=1,
             help="The site's password counter")
@@ -45,6 +49,101 @@ def main(*arglist):
             help='Print the password to stdout')
     generate.add_argument('-x', '--clipboard', '--copy', action='store_true',
             help='Copy the password to the system clipboard')
+    generate.add_argument('-k', '--cache', choices=['session', 'user'],
+            help='Cache the master key in the session or user keyring')
+    generate.add_argument('--cache-timeout', type=cache.parse_timeout, default=900,
+            help='Seconds to keep the master key cached for')
+    generate.add_argument('-P', '--policy',
+            help='JSON file of site password policies to satisfy')
+
+    # mpw batch
+    batch_ = subparsers.add_parser('batch',
+            help='Generate passwords for a list of sites')
+    batch_.set_defaults(func=cmd.batch)
+    batch_.add_argument('name', help='Your full name')
+    batch_.add_argument('-v', '--version', type=int, default=3,
+            choices=[0, 1, 2, 3], help='MasterPassword algorithm version')
+    batch_.add_argument('input',
+            help='CSV file of site names, with optional counters and templates')
+    batch_.add_argument('-o', '--output', required=True,
+            help='CSV file to write the passwords to')
+    batch_.add_argument('-t', '--template', default='long',
+            choices=list(algorithm.TEMPLATE_TYPES) + ['all'],
+            help='The default password type template')
+    batch_.add_argument('-c', '--counter', type=int, default=1,
+            help="The default site's password counter")
+    batch_.add_argument('-s', '--shard', type=batch.parse_shard, default=(0, 1),
+            help='Only generate shard i of n of the input (as i/n)')
+    batch_.add_argument('--checkpoint',
+            help='File to save progress to, and resume from if it exists')
+    batch_.add_argument('--checkpoint-every', type=int, default=1000,
+            help='Number of input rows between checkpoints')
+    batch_.add_argument('-n', '--normalize', type=normalize.parse_rules,
+            default=(), help='Comma separated site name normalization rules '
+            '(strip, casefold, idna)')
+    batch_.add_argument('--memo-size', type=int, default=10000,
+            help='Number of recent results to reuse for duplicate sites')
+    batch_.add_argument('--report-quirks', action='store_true',
+            help='Report sites whose password differs between versions 0/1 and 2/3')
+    batch_.add_argument('-k', '--cache', choices=['session', 'user'],
+            help='Cache the master key in the session or user keyring')
+    batch_.add_argument('--cache-timeout', type=cache.parse_timeout, default=900,
+            help='Seconds to keep the master key cached for')
+
+    # mpw merge
+    merge = subparsers.add_parser('merge',
+            help='Merge the outputs of sharded batch jobs')
+    merge.set_defaults(func=cmd.merge)
+    merge.add_argument('inputs', nargs='+', metavar='input',
+            help='CSV file output by a batch job')
+    merge.add_argument('-o', '--output', required=True,
+            help='CSV file to write the merged passwords to')
+
+    # mpw pack
+    pack = subparsers.add_parser('pack',
+            help='Pack batch job outputs into a compact binary file')
+    pack.set_defaults(func=cmd.pack)
+    pack.add_argument('inputs', nargs='+', metavar='input',
+            help='CSV file output by a batch job')
+    pack.add_argument('-o', '--output', required=True,
+            help='Binary file to write the passwords to')
+
+    # mpw lookup
+    lookup = subparsers.add_parser('lookup',
+            help='Look up a site in a packed binary file')
+    lookup.set_defaults(func=cmd.lookup)
+    lookup.add_argument('input', help='Binary file created by pack')
+    lookup.add_argument('site', help='The site name')
+    lookup.add_argument('-t', '--template', choices=algorithm.TEMPLATE_TYPES,
+            help='Only show passwords with this template')
+    lookup.add_argument('-c', '--counter', type=int,
+            help='Only show passwords with this counter')
+
+    # mpw stdio
+    stdio = subparsers.add_parser('stdio',
+            help='Answer JSON requests on stdin, for use by other programs')
+    stdio.set_defaults(func=cmd.stdio)
+    stdio.add_argument('-w', '--workers', type=int, default=4,
+            help='Number of requests to handle at once')
+    stdio.add_argument('-k', '--cache', choices=['session', 'user'],
+            help='Cache the master keys in the session or user keyring')
+    stdio.add_argument('--cache-timeout', type=cache.parse_timeout, default=900,
+            help='Seconds to keep the master keys cached for')
+
+    # mpw identicon
+    identicon = subparsers.add_parser('identicon',
+            help='Display the identicon for some login details')
+    identicon.set_defaults(func=cmd.identicon)
+    identicon.add_argument('names', nargs='*', metavar='name',
+            help='Your full name (read from stdin if not given)')
+
+    # mpw forget
+    forget = subparsers.add_parser('forget',
+            help='Remove all cached master keys')
+    forget.set_defaults(func=cmd.forget)
+    forget.add_argument('-k', '--cache', default='session',
+            choices=['session', 'user'],
+            help='The keyring to remove the master keys from')
 
     # mpw prompt
     prompt = subparsers.add_parser('prompt',
@@ -63,6 +162,10 @@ def main(*arglist):
             help='Print the password to stdout')
     prompt.add_argument('-x', '--clipboard', action='store_true',
             help='Copy the password to the system clipboard')
+    prompt.add_argument('-k', '--cache', choices=['session', 'user'],
+            help='Cache the master key in the session or user keyring')
+    prompt.add_argument('--cache-timeout', type=cache.parse_timeout, default=900,
+            help='Seconds to keep the master key cached for')
     prompt.add_argument('-l', '--loop', action='store_true',
             help='Read site details in a loop')
 
@@ -83,6 +186,10 @@ def main(*arglist):
             help='Print the password to stdout')
     dialog.add_argument('-x', '--clipboard', action='store_true',
             help='Copy the password to the system clipboard')
+    dialog.add_argument('-k', '--cache', choices=['session', 'user'],
+            help='Cache the master key in the session or user keyring')
+    dialog.add_argument('--cache-timeout', type=cache.parse_timeout, default=900,
+            help='Seconds to keep the master key cached for')
     dialog.add_argument('-l', '--loop', action='store_true',
             help='Read site details in a loop')
 
@@ -92,6 +199,9 @@ def main(*arglist):
         args = parser.parse_args()
 
     if hasattr(args, 'func'):
+        # show warnings (e.g. from the key cache) as plain messages
+        warnings.formatwarning = lambda message, *args: 'Warning: {}\n'.format(message)
+
         try:
             args = vars(args)
             func = args.pop('func')
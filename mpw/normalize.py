@@ -0,0 +1,130 @@
+# =============================================================================
+#
+#  Copyright (c) 2017, Justin Chadwell.
+#
+#  This program is free software: you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation, either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You can find a copy of the GNU General Public License in the LICENSE file.
+#  Alternatively, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+from collections import OrderedDict
+
+from .algorithm import utf8
+
+def normalize_site(site, rules=('strip', 'casefold')):
+    '''
+    Normalize a site name, so that variants of it generate the same password.
+
+    Args:
+        site: The site's name.
+        rules: The normalization rules to apply, in order ('strip' to trim
+            whitespace, 'casefold' to ignore case, and 'idna' to convert
+            internationalized domain names to their ASCII form).
+
+    Returns:
+        The normalized site name.
+    '''
+
+    for rule in rules:
+        if rule == 'strip':
+            site = site.strip()
+        elif rule == 'casefold':
+            site = site.casefold()
+        elif rule == 'idna':
+            try:
+                site = site.encode('idna').decode('ascii')
+            except UnicodeError:
+                raise ValueError('invalid domain name: {}'.format(site))
+        else:
+            raise ValueError('invalid normalization rule')
+
+    return site
+
+def parse_rules(value):
+    '''
+    Parse a comma separated list of normalization rules.
+
+    Args:
+        value: The list of rules.
+
+    Returns:
+        A tuple of the rules.
+    '''
+
+    rules = tuple(rule.strip() for rule in value.split(',') if rule.strip())
+    for rule in rules:
+        if rule not in RULES:
+            raise ValueError('invalid normalization rule')
+
+    return rules
+
+def has_length_quirk(site):
+    '''
+    Check whether a site's seed differs between algorithm versions because of
+    how its length is encoded.
+
+    Versions 0 and 1 use the number of characters in the site name, and
+    versions 2 and 3 use the number of bytes in its UTF-8 encoding, so the
+    two only agree for ASCII site names.
+
+    Args:
+        site: The site's name.
+
+    Returns:
+        True if the site's seed differs between versions 0/1 and 2/3.
+    '''
+
+    return len(site) != len(utf8(site))
+
+class Memo:
+    '''
+    A bounded memo table, discarding the least recently used entries once
+    it is full.
+    '''
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, func):
+        '''
+        Get a memoized value, computing and storing it if it isn't present.
+
+        Args:
+            key: The key to look up.
+            func: A function to compute the value if it isn't present.
+
+        Returns:
+            The value.
+        '''
+
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+
+        value = func()
+        if self.size > 0:
+            self.entries[key] = value
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+        return value
+
+RULES = ('strip', 'casefold', 'idna')
@@ -0,0 +1,223 @@
+# =============================================================================
+#
+#  Copyright (c) 2017, Justin Chadwell.
+#
+#  This program is free software: you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation, either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You can find a copy of the GNU General Public License in the LICENSE file.
+#  Alternatively, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+import json
+import time
+import string
+
+from .algorithm import TEMPLATE_TYPES, CHARACTER_GROUPS
+
+class Policy:
+    '''
+    A site's password policy.
+
+    The policy is compiled once into a set of allowed characters and a list of
+    required character sets, so checking a password is cheap.
+    '''
+
+    def __init__(self, min_length=None, max_length=None, allowed=None,
+            required=(), forbidden=''):
+        '''
+        Create a password policy.
+
+        Args:
+            min_length: The minimum password length.
+            max_length: The maximum password length.
+            allowed: The character classes allowed in the password (defaults
+                to all of them).
+            required: The character classes the password must contain at
+                least one character from.
+            forbidden: Any individual characters that are not allowed.
+        '''
+
+        self.min_length = min_length
+        self.max_length = max_length
+        self.allowed = list(CHARACTER_CLASSES) if allowed is None else list(allowed)
+        self.required = list(required)
+        self.forbidden = forbidden
+
+        for cls in self.allowed + self.required:
+            if cls not in CHARACTER_CLASSES:
+                raise ValueError('invalid character class')
+
+        self._allowed_chars = frozenset(
+                ''.join(CHARACTER_CLASSES[cls] for cls in self.allowed)) - \
+                frozenset(self.forbidden)
+        self._required_chars = [
+                frozenset(CHARACTER_CLASSES[cls]) & self._allowed_chars
+                for cls in self.required
+        ]
+
+    def __call__(self, password):
+        '''
+        Check whether a password is accepted by the policy.
+
+        Args:
+            password: The password to check.
+
+        Returns:
+            True if the password is accepted.
+        '''
+
+        if self.min_length is not None and len(password) < self.min_length:
+            return False
+        if self.max_length is not None and len(password) > self.max_length:
+            return False
+        if not self._allowed_chars.issuperset(password):
+            return False
+        for chars in self._required_chars:
+            if chars.isdisjoint(password):
+                return False
+
+        return True
+
+    def feasible(self, template_type):
+        '''
+        Check whether a template can ever produce a password accepted by the
+        policy, without generating any passwords.
+
+        Args:
+            template_type: The type of password.
+
+        Returns:
+            True if the template might produce an accepted password.
+        '''
+
+        for template in TEMPLATE_TYPES[template_type]:
+            if self.min_length is not None and len(template) < self.min_length:
+                continue
+            if self.max_length is not None and len(template) > self.max_length:
+                continue
+
+            # every position must be able to produce an allowed character
+            positions = [frozenset(CHARACTER_GROUPS.get(tchar, tchar))
+                         for tchar in template]
+            if any(p.isdisjoint(self._allowed_chars) for p in positions):
+                continue
+
+            possible = frozenset().union(*positions) & self._allowed_chars
+            if all(not chars.isdisjoint(possible) for chars in self._required_chars):
+                return True
+
+        return False
+
+    def to_dict(self):
+        '''
+        Convert the policy to a dictionary, suitable for storing as JSON.
+
+        Returns:
+            The policy dictionary.
+        '''
+
+        return {
+            'min_length': self.min_length,
+            'max_length': self.max_length,
+            'allowed': self.allowed,
+            'required': self.required,
+            'forbidden': self.forbidden
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        '''
+        Create a policy from a dictionary created by to_dict.
+
+        Args:
+            data: The policy dictionary.
+
+        Returns:
+            The policy.
+        '''
+
+        return cls(**data)
+
+def search(generator, key, site, template_type, policy, counter=1,
+        max_tries=10000, timeout=1.0):
+    '''
+    Find the first site password accepted by a policy.
+
+    Successive counters are tried, starting from the given counter, until an
+    accepted password is found.
+
+    Args:
+        generator: The algorithm object.
+        key: The master key.
+        site: The site's name.
+        template_type: The type of password to generate.
+        policy: The site's password policy.
+        counter: The first password version to try.
+        max_tries: The maximum number of counters to try.
+        timeout: The maximum number of seconds to search for.
+
+    Returns:
+        A tuple of the accepted password and its counter, or None if no
+        password was found within the limits.
+    '''
+
+    if template_type not in TEMPLATE_TYPES:
+        raise ValueError('invalid template')
+    if not policy.feasible(template_type):
+        raise ValueError('policy can never be satisfied by template')
+
+    deadline = time.monotonic() + timeout
+    passwords = generator.iter_passwords(key, site, counter, template_type)
+    for i, (counter, password) in enumerate(passwords):
+        if policy(password):
+            return password, counter
+        if i + 1 >= max_tries or time.monotonic() > deadline:
+            break
+
+    return None
+
+def load_policies(path):
+    '''
+    Load site policies from a JSON file.
+
+    Args:
+        path: The policy file.
+
+    Returns:
+        A dictionary mapping site names to their policy.
+    '''
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    return {site: Policy.from_dict(policy) for site, policy in data.items()}
+
+def save_policies(path, policies):
+    '''
+    Save site policies to a JSON file.
+
+    Args:
+        path: The policy file.
+        policies: A dictionary mapping site names to their policy.
+    '''
+
+    data = {site: policy.to_dict() for site, policy in policies.items()}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4, sort_keys=True, ensure_ascii=False)
+
+CHARACTER_CLASSES = {
+    'upper': string.ascii_uppercase,
+    'lower': string.ascii_lowercase,
+    'digit': string.digits,
+    'symbol': string.punctuation,
+    'space': ' '
+}
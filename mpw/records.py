@@ -0,0 +1,239 @@
+# =============================================================================
+#
+#  Copyright (c) 2017, Justin Chadwell.
+#
+#  This program is free software: you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation, either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You can find a copy of the GNU General Public License in the LICENSE file.
+#  Alternatively, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+import os
+import mmap
+import struct
+
+from Crypto.Hash import SHA256
+
+from .algorithm import MAX_COUNTER, TEMPLATE_TYPES, utf8
+
+# A record file is a header followed by fixed size records, sorted by the
+# hash of their site name (then by counter and template), so a site can be
+# found with a binary search directly on the file contents.
+#
+# header: magic, format version, record size, record count
+# record: site hash, counter, template index, password length, password
+
+def write(path, entries):
+    '''
+    Write password generation results to a record file.
+
+    Args:
+        path: The record file.
+        entries: An iterable of (site, counter, template, password) tuples.
+
+    Returns:
+        The number of records written.
+    '''
+
+    records = []
+    for i, (site, counter, template, password) in enumerate(entries):
+        try:
+            check_entry(site, counter, template, password)
+        except ValueError as e:
+            raise ValueError('{} on entry {}'.format(e, i + 1))
+
+        password = password.encode('ascii')
+        records.append(RECORD.pack(site_hash(site), counter,
+                TEMPLATE_NAMES.index(template), len(password), password))
+    # duplicate entries (e.g. from site name variants) are only stored once
+    records = sorted(set(records))
+
+    # the records contain site passwords, so only the user can read them
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(fd, 0o600)
+    with open(fd, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size, len(records)))
+        f.writelines(records)
+
+    return len(records)
+
+def check_entry(site, counter, template, password):
+    '''
+    Check that an entry fits in a record, since struct would otherwise
+    silently truncate it.
+
+    Args:
+        site: The site's name.
+        counter: The password counter.
+        template: The password template.
+        password: The site password.
+    '''
+
+    if not isinstance(counter, int) or not 0 <= counter <= MAX_COUNTER:
+        raise ValueError('invalid counter')
+    if template not in TEMPLATE_NAMES:
+        raise ValueError('invalid template')
+    try:
+        password = password.encode('ascii')
+    except UnicodeEncodeError:
+        raise ValueError('password is not ASCII')
+    if len(password) > PASSWORD_SIZE:
+        raise ValueError('password is longer than {} characters'.format(PASSWORD_SIZE))
+
+class RecordFile:
+    '''
+    Read a record file, without loading or parsing it all into memory.
+
+    The file is memory mapped, and records are only unpacked when they are
+    accessed.
+    '''
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, size, self.count = HEADER.unpack_from(self.mmap)
+        except struct.error:
+            magic = None
+        if magic != MAGIC or version != FORMAT_VERSION or size != RECORD.size:
+            self.mmap.close()
+            raise ValueError('invalid record file')
+        if len(self.mmap) != HEADER.size + self.count * RECORD.size:
+            self.mmap.close()
+            raise ValueError('truncated record file')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        '''
+        Get a single record.
+
+        Args:
+            i: The index of the record.
+
+        Returns:
+            A tuple of the site hash, counter, template and password.
+        '''
+
+        if not 0 <= i < self.count:
+            raise IndexError('record index out of range')
+
+        shash, counter, template, length, password = \
+                RECORD.unpack_from(self.mmap, HEADER.size + i * RECORD.size)
+        return shash, counter, TEMPLATE_NAMES[template], password[:length].decode('ascii')
+
+    def lookup(self, site, counter=None, template=None):
+        '''
+        Find the records for a site.
+
+        Args:
+            site: The site's name.
+            counter: Only find records with this counter.
+            template: Only find records with this template.
+
+        Returns:
+            A list of (counter, template, password) tuples.
+        '''
+
+        shash = site_hash(site)
+
+        # binary search for the first record with the site's hash
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._hash(mid) < shash:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        results = []
+        for i in range(lo, self.count):
+            if self._hash(i) != shash: break
+
+            _, rcounter, rtemplate, password = self[i]
+            if counter is not None and rcounter != counter: continue
+            if template is not None and rtemplate != template: continue
+            results.append((rcounter, rtemplate, password))
+
+        return results
+
+    def view(self):
+        '''
+        Get a zero-copy view of the records.
+
+        The view must be released before the file is closed.
+
+        Returns:
+            A memoryview of the packed records.
+        '''
+
+        return memoryview(self.mmap)[HEADER.size:]
+
+    def array(self):
+        '''
+        Get a zero-copy numpy array of the records.
+
+        The array must be deleted before the file is closed.
+
+        Returns:
+            A numpy structured array, with a RECORD_DTYPE element per record.
+        '''
+
+        import numpy
+
+        return numpy.frombuffer(self.mmap, dtype=numpy.dtype(RECORD_DTYPE),
+                count=self.count, offset=HEADER.size)
+
+    def close(self):
+        self.mmap.close()
+
+    def _hash(self, i):
+        offset = HEADER.size + i * RECORD.size
+        return self.mmap[offset:offset + HASH_SIZE]
+
+def site_hash(site):
+    '''
+    Hash a site name, for use as a record key.
+
+    Args:
+        site: The site's name.
+
+    Returns:
+        The site hash.
+    '''
+
+    return SHA256.new(utf8(site)).digest()[:HASH_SIZE]
+
+MAGIC = b'MPWR'
+FORMAT_VERSION = 1
+HASH_SIZE = 16
+TEMPLATE_NAMES = list(TEMPLATE_TYPES)
+PASSWORD_SIZE = max(len(template) for templates in TEMPLATE_TYPES.values()
+                    for template in templates)
+
+HEADER = struct.Struct('>4sHHQ')
+RECORD = struct.Struct('>{}sIBB{}s'.format(HASH_SIZE, PASSWORD_SIZE))
+RECORD_DTYPE = [
+    ('hash', 'S{}'.format(HASH_SIZE)),
+    ('counter', '>u4'),
+    ('template', 'u1'),
+    ('length', 'u1'),
+    ('password', 'S{}'.format(PASSWORD_SIZE))
+]
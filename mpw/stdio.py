@@ -0,0 +1,193 @@
+# =============================================================================
+#
+#  Copyright (c) 2017, Justin Chadwell.
+#
+#  This program is free software: you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation, either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You can find a copy of the GNU General Public License in the LICENSE file.
+#  Alternatively, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from . import algorithm
+from . import policy as policy_
+
+class StdioServer:
+    '''
+    Answer password generation requests, speaking line-delimited JSON.
+
+    Each request is a JSON object on its own line, with an "id", a "method"
+    and its "params". Requests are handled concurrently, so their responses
+    (JSON objects with the same "id" and either a "result" or an "error") may
+    be written out of order.
+
+    Master keys are kept in memory for the lifetime of the server, so only
+    the first request for a set of login details has to wait for them to be
+    generated.
+
+    Methods:
+        generate: Generate a site password, with the params "name",
+            "password", "site" and optionally "counter", "template" (which
+            may be "all") and "version". If a "policy" is given, the
+            result is the first password (and its counter) that satisfies
+            it.
+        identicon: Get the identicon for the params "name" and "password".
+        forget: Remove matching master keys from memory, optionally filtered
+            by the params "name", "password" and "version".
+    '''
+
+    def __init__(self, input, output, workers=4, cache=None):
+        self.input = input
+        self.output = output
+        self.workers = workers
+        self.cache = cache
+
+        self.keys = {}
+        self.keys_lock = threading.Lock()
+        self.output_lock = threading.Lock()
+
+        self.methods = {
+            'generate': self.generate,
+            'identicon': self.identicon,
+            'forget': self.forget
+        }
+
+    def run(self):
+        '''
+        Handle requests until the end of the input.
+        '''
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            for line in self.input:
+                if not line.strip(): continue
+
+                try:
+                    request = json.loads(line)
+                    rid = request.get('id')
+                except (ValueError, AttributeError):
+                    self.respond({'id': None, 'error': 'invalid request'})
+                    continue
+
+                method = request.get('method')
+                method = self.methods.get(method) if isinstance(method, str) else None
+                params = request.get('params', {})
+                if method is None:
+                    self.respond({'id': rid, 'error': 'unknown method'})
+                    continue
+                if not isinstance(params, (dict, list)):
+                    self.respond({'id': rid, 'error': 'invalid params'})
+                    continue
+
+                executor.submit(self.handle, rid, method, params)
+
+    def handle(self, rid, method, params):
+        '''
+        Handle a single request, and write out its response.
+
+        Args:
+            rid: The request id.
+            method: The method to call.
+            params: The parameters to call the method with, either an object
+                of keyword arguments or a list of positional arguments.
+        '''
+
+        try:
+            if isinstance(params, dict):
+                result = method(**params)
+            else:
+                result = method(*params)
+        except Exception as e:
+            self.respond({'id': rid, 'error': str(e) or type(e).__name__})
+        else:
+            self.respond({'id': rid, 'result': result})
+
+    def respond(self, response):
+        '''
+        Write a response to the output.
+
+        Args:
+            response: The response object.
+        '''
+
+        line = json.dumps(response)
+        with self.output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def generate(self, name, password, site, counter=1, template='long', version=3,
+            policy=None):
+        gen = algorithm.Algorithm(version)
+        key = self.key(gen, name, password)
+
+        if policy is not None:
+            result = policy_.search(gen, key, site, template,
+                    policy_.Policy.from_dict(policy), counter)
+            if result is None:
+                raise ValueError('no password matching the policy')
+            return {'password': result[0], 'counter': result[1]}
+        elif template == 'all':
+            return gen.generate_passwords(key, site, counter)
+        elif template in algorithm.TEMPLATE_TYPES:
+            return gen.generate_password(key, site, counter, template)
+        else:
+            raise ValueError('invalid template')
+
+    def identicon(self, name, password):
+        icon, color = algorithm.identicon(password, name)
+        return {'identicon': icon, 'color': color}
+
+    def forget(self, name=None, password=None, version=None):
+        with self.keys_lock:
+            for ident in list(self.keys):
+                if (name is None or ident[1] == name) and \
+                   (password is None or ident[2] == password) and \
+                   (version is None or ident[0] == version):
+                    del self.keys[ident]
+
+        return True
+
+    def key(self, gen, name, password):
+        '''
+        Get the master key for some login details.
+
+        Concurrent requests for the same login details share the same key
+        generation, instead of each generating the key themselves.
+
+        Args:
+            gen: The algorithm object.
+            name: The user's full name.
+            password: The master password.
+
+        Returns:
+            The master key.
+        '''
+
+        ident = (gen.VERSION, name, password)
+        with self.keys_lock:
+            future = self.keys.get(ident)
+            owner = future is None
+            if owner:
+                future = self.keys[ident] = Future()
+
+        if owner:
+            try:
+                future.set_result(gen.generate_key(password, name, self.cache))
+            except Exception as e:
+                with self.keys_lock:
+                    if self.keys.get(ident) is future:
+                        del self.keys[ident]
+                future.set_exception(e)
+
+        return future.result()
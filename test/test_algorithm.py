@@ -212,3 +212,30 @@ class TestAlgorithmV3(unittest.TestCase):
     def test_template_phrase(self):
         password = helper(version=3, template='phrase')
         self.assertEqual(password, 'jejr quv cabsibu tam')
+
+class TestIdenticon(unittest.TestCase):
+    def test_core(self):
+        icon = mpw.algorithm.identicon('banana colored duckling', 'Robert Lee Mitchell')
+        self.assertEqual(icon, ('╚☻╯⛄', 'green'))
+
+    def test_master_password(self):
+        icon = mpw.algorithm.identicon('banana colored duckling', 'Robert Lee Mitchell')
+        typo = mpw.algorithm.identicon('banana colored ducklinf', 'Robert Lee Mitchell')
+        self.assertNotEqual(icon, typo)
+
+class TestAllTemplates(unittest.TestCase):
+    def test_core(self):
+        gen = mpw.algorithm.Algorithm(3)
+        key = gen.generate_key('banana colored duckling', 'Robert Lee Mitchell')
+        passwords = gen.generate_passwords(key, 'masterpasswordapp.com', 1)
+
+        self.assertEqual(set(passwords), set(mpw.algorithm.TEMPLATE_TYPES))
+        for template, password in passwords.items():
+            expected = gen.generate_password(key, 'masterpasswordapp.com', 1, template)
+            self.assertEqual(password, expected)
+
+    def test_subset(self):
+        gen = mpw.algorithm.Algorithm(3)
+        key = gen.generate_key('banana colored duckling', 'Robert Lee Mitchell')
+        passwords = gen.generate_passwords(key, 'masterpasswordapp.com', 1, ['pin', 'short'])
+        self.assertEqual(passwords, {'pin': '7662', 'short': 'Jej2'})
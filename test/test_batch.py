@@ -0,0 +1,181 @@
+# =============================================================================
+#
+#  Copyright (c) 2017, Justin Chadwell.
+#
+#  This program is free software: you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation, either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You can find a copy of the GNU General Public License in the LICENSE file.
+#  Alternatively, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+import os
+import json
+import tempfile
+import unittest
+
+import mpw.algorithm
+import mpw.batch
+
+SITES = ['masterpasswordapp.com', 'example.com,3', '', 'example.org,,pin',
+         '⛄,2', 'example.net']
+
+class TestBatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gen = mpw.algorithm.Algorithm(3)
+        cls.key = cls.gen.generate_key('banana colored duckling', 'Robert Lee Mitchell')
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input = self.path('input.csv')
+        with open(self.input, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(SITES) + '\n')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def job(self):
+        job = mpw.batch.describe_job(self.input, version=self.gen.VERSION)
+        job['key'] = mpw.batch.key_fingerprint(self.key)
+        return job
+
+    def read(self, name):
+        with open(self.path(name), encoding='utf-8') as f:
+            return f.read()
+
+    def test_run(self):
+        count = mpw.batch.run(self.gen, self.key, self.input, self.path('out.csv'))
+        self.assertEqual(count, 5)
+
+        rows = self.read('out.csv').splitlines()
+        self.assertEqual(rows[0], '0,masterpasswordapp.com,masterpasswordapp.com,1,long,Jejr5[RepuSosp')
+        self.assertEqual(rows[2], '3,example.org,example.org,1,pin,' + self.gen.generate_password(self.key, 'example.org', 1, 'pin'))
+        self.assertEqual(rows[3], '4,⛄,⛄,2,long,' + self.gen.generate_password(self.key, '⛄', 2, 'long'))
+
+    def test_all_templates(self):
+        count = mpw.batch.run(self.gen, self.key, self.input, self.path('out.csv'),
+                template='all')
+        self.assertEqual(count, 4 * len(mpw.algorithm.TEMPLATE_TYPES) + 1)
+
+    def test_shard_merge(self):
+        mpw.batch.run(self.gen, self.key, self.input, self.path('full.csv'))
+
+        shards = []
+        for i in range(3):
+            shards.append(self.path('shard{}.csv'.format(i)))
+            mpw.batch.run(self.gen, self.key, self.input, shards[-1], shard=(i, 3))
+        mpw.batch.merge(shards, self.path('merged.csv'))
+
+        self.assertEqual(self.read('merged.csv'), self.read('full.csv'))
+
+    def test_resume(self):
+        mpw.batch.run(self.gen, self.key, self.input, self.path('full.csv'))
+
+        # simulate a job interrupted after a checkpoint at the second row
+        checkpoint = self.path('checkpoint.json')
+        first = self.read('full.csv').splitlines(keepends=True)[0]
+        with open(self.path('out.csv'), 'w', encoding='utf-8', newline='') as f:
+            f.write(first + '1,partial row')
+        with open(checkpoint, 'w') as f:
+            json.dump(dict(self.job(), input_offset=1,
+                    output_size=len(first.encode())), f)
+
+        count = mpw.batch.run(self.gen, self.key, self.input, self.path('out.csv'),
+                checkpoint_path=checkpoint)
+        self.assertEqual(count, 4)
+        self.assertEqual(self.read('out.csv'), self.read('full.csv'))
+
+        # resuming a finished job is an error
+        self.assertRaises(ValueError, mpw.batch.run, self.gen, self.key,
+                self.input, self.path('out.csv'), checkpoint_path=checkpoint)
+        self.assertEqual(self.read('out.csv'), self.read('full.csv'))
+
+    def test_resume_mismatch(self):
+        checkpoint = self.path('checkpoint.json')
+        with open(checkpoint, 'w') as f:
+            json.dump(dict(self.job(), input_offset=1, output_size=0), f)
+
+        # the output file is missing
+        self.assertRaises(ValueError, mpw.batch.run, self.gen, self.key,
+                self.input, self.path('out.csv'), checkpoint_path=checkpoint)
+
+        # the job options differ
+        open(self.path('out.csv'), 'w').close()
+        self.assertRaises(ValueError, mpw.batch.run, self.gen, self.key,
+                self.input, self.path('out.csv'), template='pin',
+                checkpoint_path=checkpoint)
+
+        # the input has changed
+        with open(self.input, 'a') as f:
+            f.write('example.info\n')
+        self.assertRaises(ValueError, mpw.batch.run, self.gen, self.key,
+                self.input, self.path('out.csv'), checkpoint_path=checkpoint)
+
+    def test_resume_other_key(self):
+        checkpoint = self.path('checkpoint.json')
+        with open(checkpoint, 'w') as f:
+            json.dump(dict(self.job(), input_offset=1, output_size=0), f)
+        open(self.path('out.csv'), 'w').close()
+
+        # a different algorithm version
+        gen = mpw.algorithm.Algorithm(2)
+        self.assertRaises(ValueError, mpw.batch.run, gen, self.key,
+                self.input, self.path('out.csv'), checkpoint_path=checkpoint)
+
+        # a different master key
+        self.assertRaises(ValueError, mpw.batch.run, self.gen, b'other key',
+                self.input, self.path('out.csv'), checkpoint_path=checkpoint)
+
+    def test_invalid_counter(self):
+        with open(self.input, 'w', encoding='utf-8') as f:
+            f.write('example.com\nexample.org,abc\n')
+
+        with self.assertRaisesRegex(ValueError, 'row 2'):
+            mpw.batch.validate(self.input)
+
+    def test_permissions(self):
+        mpw.batch.run(self.gen, self.key, self.input, self.path('out.csv'))
+        self.assertEqual(os.stat(self.path('out.csv')).st_mode & 0o777, 0o600)
+
+    def test_normalize(self):
+        with open(self.input, 'w', encoding='utf-8') as f:
+            f.write('masterpasswordapp.com\n MasterPasswordApp.com\n⛄,2\n')
+
+        quirks = []
+        mpw.batch.run(self.gen, self.key, self.input, self.path('out.csv'),
+                normalize=('strip', 'casefold'), memo_size=10,
+                on_quirk=lambda i, site: quirks.append((i, site)))
+
+        rows = self.read('out.csv').splitlines()
+        self.assertEqual(rows[0], '0,masterpasswordapp.com,masterpasswordapp.com,1,long,Jejr5[RepuSosp')
+        self.assertEqual(rows[1], '1, MasterPasswordApp.com,masterpasswordapp.com,1,long,Jejr5[RepuSosp')
+        self.assertEqual(quirks, [(2, '⛄')])
+
+    def test_invalid_domain(self):
+        with open(self.input, 'w', encoding='utf-8') as f:
+            f.write('example.com\na..b\n')
+
+        mpw.batch.validate(self.input)
+        with self.assertRaisesRegex(ValueError, 'row 2'):
+            mpw.batch.validate(self.input, normalize=('idna',))
+        with self.assertRaisesRegex(ValueError, 'row 2'):
+            mpw.batch.run(self.gen, self.key, self.input, self.path('out.csv'),
+                    normalize=('idna',))
+
+    def test_parse_shard(self):
+        self.assertEqual(mpw.batch.parse_shard('1/4'), (1, 4))
+        self.assertRaises(ValueError, mpw.batch.parse_shard, '4/4')
+        self.assertRaises(ValueError, mpw.batch.parse_shard, '1')
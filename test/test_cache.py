@@ -0,0 +1,119 @@
+# =============================================================================
+#
+#  Copyright (c) 2017, Justin Chadwell.
+#
+#  This program is free software: you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation, either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You can find a copy of the GNU General Public License in the LICENSE file.
+#  Alternatively, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+import os
+import time
+import tempfile
+import unittest
+from unittest import mock
+
+import mpw.algorithm
+import mpw.cache
+
+class TestFileCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = mpw.cache.Cache('file', path=self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_get_put(self):
+        self.assertIsNone(self.cache.get(3, 'Robert Lee Mitchell', 'banana'))
+        self.cache.put(3, 'Robert Lee Mitchell', 'banana', b'key')
+        self.assertEqual(self.cache.get(3, 'Robert Lee Mitchell', 'banana'), b'key')
+
+    def test_mismatch(self):
+        self.cache.put(3, 'Robert Lee Mitchell', 'banana', b'key')
+        self.assertIsNone(self.cache.get(2, 'Robert Lee Mitchell', 'banana'))
+        self.assertIsNone(self.cache.get(3, 'Robert Mitchell', 'banana'))
+        self.assertIsNone(self.cache.get(3, 'Robert Lee Mitchell', 'bananas'))
+
+    def test_timeout(self):
+        self.cache.put(3, 'Robert Lee Mitchell', 'banana', b'key')
+        with mock.patch('time.time', return_value=time.time() + 900):
+            self.assertIsNone(self.cache.get(3, 'Robert Lee Mitchell', 'banana'))
+
+    def test_invalid_timeout(self):
+        with self.assertRaises(ValueError):
+            mpw.cache.Cache('file', timeout=0, path=self.tmpdir.name)
+        with self.assertRaises(ValueError):
+            mpw.cache.Cache('session', timeout=-1)
+        with self.assertRaises(ValueError):
+            mpw.cache.parse_timeout('0')
+
+    def test_forget(self):
+        self.cache.put(3, 'Robert Lee Mitchell', 'banana', b'key')
+        self.cache.put(3, 'Jim Smith', 'apple', b'key')
+        self.cache.forget(3, 'Robert Lee Mitchell')
+        self.assertIsNone(self.cache.get(3, 'Robert Lee Mitchell', 'banana'))
+        self.assertEqual(self.cache.get(3, 'Jim Smith', 'apple'), b'key')
+
+    def test_clear(self):
+        self.cache.put(3, 'Robert Lee Mitchell', 'banana', b'key')
+        self.cache.put(3, 'Jim Smith', 'apple', b'key')
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(3, 'Robert Lee Mitchell', 'banana'))
+        self.assertIsNone(self.cache.get(3, 'Jim Smith', 'apple'))
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_sweep(self):
+        self.cache.put(3, 'Robert Lee Mitchell', 'banana', b'key')
+        with mock.patch('time.time', return_value=time.time() + 900):
+            self.cache.put(3, 'Jim Smith', 'apple', b'key')
+
+        # the expired key is removed without being looked up again
+        self.assertEqual(len(os.listdir(self.tmpdir.name)), 1)
+
+    def test_entry_names(self):
+        self.cache.put(3, 'Robert Lee Mitchell', 'banana', b'key')
+        other = mpw.cache.Cache('file', path=self.tmpdir.name)
+        other_names = set(os.listdir(self.tmpdir.name))
+
+        # entries are named independently of the master password
+        other.put(3, 'Robert Lee Mitchell', 'apple', b'key')
+        self.assertEqual(set(os.listdir(self.tmpdir.name)), other_names)
+        self.assertIsNone(self.cache.get(3, 'Robert Lee Mitchell', 'banana'))
+        self.assertEqual(self.cache.get(3, 'Robert Lee Mitchell', 'apple'), b'key')
+
+    def test_generate_key(self):
+        gen = mpw.algorithm.Algorithm(3)
+        key = gen.generate_key('banana', 'Robert Lee Mitchell', self.cache)
+        self.assertEqual(self.cache.get(3, 'Robert Lee Mitchell', 'banana'), key)
+
+        # the cached key is returned without running scrypt again
+        self.cache.put(3, 'Robert Lee Mitchell', 'banana', b'cached')
+        key = gen.generate_key('banana', 'Robert Lee Mitchell', self.cache)
+        self.assertEqual(key, b'cached')
+
+    def test_broken_cache(self):
+        # the cache directory can't be created, as a file is in the way
+        path = os.path.join(self.tmpdir.name, 'file')
+        open(path, 'w').close()
+        cache = mpw.cache.Cache('file', path=os.path.join(path, 'mpw'))
+
+        gen = mpw.algorithm.Algorithm(3)
+        with self.assertWarns(UserWarning):
+            key = gen.generate_key('banana', 'Robert Lee Mitchell', cache)
+        self.assertEqual(key, gen.generate_key('banana', 'Robert Lee Mitchell'))
+
+class TestKeyringCache(unittest.TestCase):
+    def test_missing_keyctl(self):
+        with self.assertRaises(mpw.cache.CacheError):
+            mpw.cache.Cache('session', keyctl='mpw-no-such-keyctl')
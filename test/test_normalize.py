@@ -0,0 +1,64 @@
+# =============================================================================
+#
+#  Copyright (c) 2017, Justin Chadwell.
+#
+#  This program is free software: you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation, either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You can find a copy of the GNU General Public License in the LICENSE file.
+#  Alternatively, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+import unittest
+
+import mpw.normalize
+
+class TestNormalize(unittest.TestCase):
+    def test_default(self):
+        self.assertEqual(mpw.normalize.normalize_site('  GitHub.com '), 'github.com')
+
+    def test_rules(self):
+        self.assertEqual(mpw.normalize.normalize_site(' GitHub.com ', ()), ' GitHub.com ')
+        self.assertEqual(mpw.normalize.normalize_site(' GitHub.com ', ['strip']), 'GitHub.com')
+        self.assertEqual(mpw.normalize.normalize_site('Straße.de', ['casefold']), 'strasse.de')
+        self.assertEqual(mpw.normalize.normalize_site('bücher.de', ['idna']), 'xn--bcher-kva.de')
+        self.assertRaises(ValueError, mpw.normalize.normalize_site, 'a', ['nonexistent'])
+
+    def test_parse_rules(self):
+        self.assertEqual(mpw.normalize.parse_rules('strip, idna'), ('strip', 'idna'))
+        self.assertRaises(ValueError, mpw.normalize.parse_rules, 'strip,nonexistent')
+
+    def test_length_quirk(self):
+        self.assertFalse(mpw.normalize.has_length_quirk('masterpasswordapp.com'))
+        self.assertTrue(mpw.normalize.has_length_quirk('⛄'))
+
+class TestMemo(unittest.TestCase):
+    def test_get(self):
+        memo = mpw.normalize.Memo(2)
+        self.assertEqual(memo.get('a', lambda: 1), 1)
+        self.assertEqual(memo.get('a', lambda: 2), 1)
+        self.assertEqual((memo.hits, memo.misses), (1, 1))
+
+    def test_bounded(self):
+        memo = mpw.normalize.Memo(2)
+        memo.get('a', lambda: 1)
+        memo.get('b', lambda: 2)
+        memo.get('a', lambda: 1)
+        memo.get('c', lambda: 3)
+
+        # 'b' was the least recently used, so it has been discarded
+        self.assertEqual(list(memo.entries), ['a', 'c'])
+
+    def test_disabled(self):
+        memo = mpw.normalize.Memo(0)
+        memo.get('a', lambda: 1)
+        self.assertEqual(memo.get('a', lambda: 2), 2)
@@ -0,0 +1,113 @@
+# =============================================================================
+#
+#  Copyright (c) 2017, Justin Chadwell.
+#
+#  This program is free software: you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation, either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You can find a copy of the GNU General Public License in the LICENSE file.
+#  Alternatively, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+import os
+import tempfile
+import unittest
+
+import mpw.algorithm
+import mpw.policy
+
+class TestPolicy(unittest.TestCase):
+    def test_length(self):
+        policy = mpw.policy.Policy(min_length=4, max_length=8)
+        self.assertTrue(policy('abcd'))
+        self.assertFalse(policy('abc'))
+        self.assertFalse(policy('abcdefghi'))
+
+    def test_allowed(self):
+        policy = mpw.policy.Policy(allowed=['upper', 'lower', 'digit'])
+        self.assertTrue(policy('Jejr5RepuSosp'))
+        self.assertFalse(policy('Jejr5[RepuSosp'))
+
+    def test_forbidden(self):
+        policy = mpw.policy.Policy(forbidden='[]')
+        self.assertTrue(policy('Jejr5@RepuSosp'))
+        self.assertFalse(policy('Jejr5[RepuSosp'))
+
+    def test_required(self):
+        policy = mpw.policy.Policy(required=['symbol', 'digit'])
+        self.assertTrue(policy('Jejr5[RepuSosp'))
+        self.assertFalse(policy('JejrRepuSosp5'))
+
+    def test_invalid_class(self):
+        self.assertRaises(ValueError, mpw.policy.Policy, allowed=['nonexistent'])
+
+    def test_feasible(self):
+        policy = mpw.policy.Policy(required=['upper'])
+        self.assertTrue(policy.feasible('long'))
+        self.assertFalse(policy.feasible('pin'))
+
+        policy = mpw.policy.Policy(max_length=10)
+        self.assertTrue(policy.feasible('medium'))
+        self.assertFalse(policy.feasible('long'))
+
+    def test_dict(self):
+        policy = mpw.policy.Policy(min_length=4, required=['digit'], forbidden='$')
+        copy = mpw.policy.Policy.from_dict(policy.to_dict())
+        self.assertEqual(copy.to_dict(), policy.to_dict())
+
+    def test_save_load(self):
+        policies = {'⛄': mpw.policy.Policy(required=['digit'])}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'policies.json')
+            mpw.policy.save_policies(path, policies)
+            loaded = mpw.policy.load_policies(path)
+
+        self.assertEqual(loaded['⛄'].to_dict(), policies['⛄'].to_dict())
+
+class TestSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gen = mpw.algorithm.Algorithm(3)
+        cls.key = cls.gen.generate_key('banana colored duckling', 'Robert Lee Mitchell')
+
+    def test_iter_passwords(self):
+        passwords = self.gen.iter_passwords(self.key, '⛄', 3, 'long')
+        for _, (counter, password) in zip(range(5), passwords):
+            expected = self.gen.generate_password(self.key, '⛄', counter, 'long')
+            self.assertEqual(password, expected)
+
+    def test_accepted(self):
+        policy = mpw.policy.Policy()
+        result = mpw.policy.search(self.gen, self.key, 'masterpasswordapp.com',
+                'long', policy)
+        self.assertEqual(result, ('Jejr5[RepuSosp', 1))
+
+    def test_rejected(self):
+        policy = mpw.policy.Policy(forbidden='[')
+        password, counter = mpw.policy.search(self.gen, self.key,
+                'masterpasswordapp.com', 'long', policy)
+
+        self.assertGreater(counter, 1)
+        self.assertTrue(policy(password))
+        self.assertEqual(password, self.gen.generate_password(self.key,
+                'masterpasswordapp.com', counter, 'long'))
+
+    def test_limits(self):
+        policy = mpw.policy.Policy(allowed=['digit'], forbidden='0123456789'[:9])
+        result = mpw.policy.search(self.gen, self.key, 'masterpasswordapp.com',
+                'pin', policy, max_tries=10)
+        self.assertIsNone(result)
+
+    def test_infeasible(self):
+        policy = mpw.policy.Policy(required=['symbol'])
+        self.assertRaises(ValueError, mpw.policy.search, self.gen, self.key,
+                'masterpasswordapp.com', 'pin', policy)
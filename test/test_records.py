@@ -0,0 +1,104 @@
+# =============================================================================
+#
+#  Copyright (c) 2017, Justin Chadwell.
+#
+#  This program is free software: you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation, either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You can find a copy of the GNU General Public License in the LICENSE file.
+#  Alternatively, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+import os
+import tempfile
+import unittest
+
+import mpw.records
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ENTRIES = [
+    ('masterpasswordapp.com', 1, 'long', 'Jejr5[RepuSosp'),
+    ('masterpasswordapp.com', 1, 'pin', '7662'),
+    ('masterpasswordapp.com', 2, 'long', 'Kiwe2^BomaMigo'),
+    ('⛄', 1, 'long', 'LiheCuwhSerz6)'),
+    ('⛄', 1, 'maximum', 'W6@692^B1#&@gVdSdLZ@'),
+    ('example.com', 3, 'phrase', 'jejr quv cabsibu tam'),
+]
+
+class TestRecords(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'passwords.mpwr')
+        self.count = mpw.records.write(self.path, ENTRIES)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_size(self):
+        self.assertEqual(self.count, len(ENTRIES))
+        self.assertEqual(os.path.getsize(self.path),
+                mpw.records.HEADER.size + len(ENTRIES) * mpw.records.RECORD.size)
+
+    def test_lookup(self):
+        with mpw.records.RecordFile(self.path) as rf:
+            self.assertEqual(len(rf), len(ENTRIES))
+            self.assertEqual(rf.lookup('masterpasswordapp.com'), [
+                (1, 'long', 'Jejr5[RepuSosp'),
+                (1, 'pin', '7662'),
+                (2, 'long', 'Kiwe2^BomaMigo')
+            ])
+            self.assertEqual(rf.lookup('⛄', template='maximum'),
+                    [(1, 'maximum', 'W6@692^B1#&@gVdSdLZ@')])
+            self.assertEqual(rf.lookup('masterpasswordapp.com', counter=2),
+                    [(2, 'long', 'Kiwe2^BomaMigo')])
+            self.assertEqual(rf.lookup('example.org'), [])
+
+    def test_duplicates(self):
+        count = mpw.records.write(self.path, ENTRIES + ENTRIES[:2])
+        self.assertEqual(count, len(ENTRIES))
+
+    def test_view(self):
+        with mpw.records.RecordFile(self.path) as rf:
+            view = rf.view()
+            self.assertEqual(len(view), len(ENTRIES) * mpw.records.RECORD.size)
+            view.release()
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_array(self):
+        with mpw.records.RecordFile(self.path) as rf:
+            array = rf.array()
+            self.assertEqual(len(array), len(ENTRIES))
+            self.assertEqual(sorted(array['counter']), sorted(e[1] for e in ENTRIES))
+            del array
+
+    def test_invalid_entries(self):
+        invalid = [
+            ('example.com', 1, 'nonexistent', 'abc'),
+            ('example.com', -1, 'long', 'abc'),
+            ('example.com', 1, 'long', 'x' * (mpw.records.PASSWORD_SIZE + 1)),
+            ('example.com', 1, 'long', '⛄'),
+        ]
+        for entry in invalid:
+            with self.assertRaisesRegex(ValueError, 'entry 3'):
+                mpw.records.write(self.path, ENTRIES[:2] + [entry])
+
+    def test_permissions(self):
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_invalid(self):
+        with open(self.path, 'r+b') as f:
+            f.write(b'XXXX')
+        self.assertRaises(ValueError, mpw.records.RecordFile, self.path)
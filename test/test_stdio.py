@@ -0,0 +1,78 @@
+# =============================================================================
+#
+#  Copyright (c) 2017, Justin Chadwell.
+#
+#  This program is free software: you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation, either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You can find a copy of the GNU General Public License in the LICENSE file.
+#  Alternatively, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+import io
+import json
+import unittest
+
+import mpw.stdio
+
+LOGIN = {'name': 'Robert Lee Mitchell', 'password': 'banana colored duckling'}
+
+def serve(*requests):
+    lines = [r if isinstance(r, str) else json.dumps(r) for r in requests]
+    output = io.StringIO()
+    server = mpw.stdio.StdioServer(io.StringIO('\n'.join(lines) + '\n'), output)
+    server.run()
+
+    responses = [json.loads(line) for line in output.getvalue().splitlines()]
+    return server, {r['id']: r for r in responses}
+
+class TestStdioServer(unittest.TestCase):
+    def test_generate(self):
+        server, responses = serve(
+            {'id': 1, 'method': 'generate',
+             'params': dict(LOGIN, site='masterpasswordapp.com')},
+            {'id': 2, 'method': 'generate',
+             'params': dict(LOGIN, site='masterpasswordapp.com', template='pin')},
+            {'id': 3, 'method': 'generate',
+             'params': dict(LOGIN, site='masterpasswordapp.com', version=0)}
+        )
+
+        self.assertEqual(responses[1]['result'], 'Jejr5[RepuSosp')
+        self.assertEqual(responses[2]['result'], '7662')
+        self.assertEqual(responses[3]['result'], 'Feji5@ReduWosh')
+        self.assertEqual(len(server.keys), 2)
+
+    def test_identicon(self):
+        _, responses = serve({'id': 'a', 'method': 'identicon', 'params': LOGIN})
+        self.assertEqual(responses['a']['result'],
+                {'identicon': '╚☻╯⛄', 'color': 'green'})
+
+    def test_errors(self):
+        _, responses = serve(
+            'not json',
+            {'id': 1, 'method': 'nonexistent'},
+            {'id': 2, 'method': 'generate', 'params': dict(LOGIN, site='a', template='b')},
+            {'id': 3, 'method': 'generate', 'params': 'abc'}
+        )
+
+        self.assertEqual(responses[None]['error'], 'invalid request')
+        self.assertEqual(responses[1]['error'], 'unknown method')
+        self.assertIn('error', responses[2])
+        self.assertEqual(responses[3], {'id': 3, 'error': 'invalid params'})
+
+    def test_forget(self):
+        server, _ = serve(
+            {'id': 1, 'method': 'generate', 'params': dict(LOGIN, site='a')}
+        )
+        self.assertEqual(len(server.keys), 1)
+        server.forget(name=LOGIN['name'])
+        self.assertEqual(len(server.keys), 0)